@@ -0,0 +1,77 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Compiled byte-level MIDI scanner.
+
+Drop-in replacement for main._parse_events_py: emits the same
+(status, data1, data2) event tuples, with (0xF0, frame, 0) for SysEx
+where frame is the complete F0..F7 wire slice. Build in place with:
+
+    python3 setup.py build_ext --inplace
+
+The bridge falls back to the pure-Python scanner when this module is
+absent.
+"""
+
+from libc.stdint cimport uint64_t
+from libc.string cimport memchr, memcpy
+
+
+cdef inline Py_ssize_t _skip_data_bytes(const unsigned char* p,
+                                        Py_ssize_t i, Py_ssize_t n):
+    # SWAR skip over runs of non-status bytes (data bytes outside any
+    # message, e.g. running-status streams): classify 8 bytes per load by
+    # masking the high bits, then finish byte-wise in the tail.
+    cdef uint64_t w
+    while i + 8 <= n:
+        memcpy(&w, p + i, 8)
+        if w & 0x8080808080808080ULL:
+            break
+        i += 8
+    while i < n and p[i] < 0x80:
+        i += 1
+    return i
+
+
+cpdef list parse_events(const unsigned char[::1] data):
+    cdef list events = []
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t n = data.shape[0]
+    cdef Py_ssize_t end
+    cdef const unsigned char* p
+    cdef const void* hit
+    cdef unsigned char status
+    if n == 0:
+        return events
+    p = &data[0]
+    while i < n:
+        status = p[i]
+        if status < 0x80:
+            i = _skip_data_bytes(p, i, n)
+        elif status < 0xC0:   # note off/on, polytouch, control change
+            if i + 3 > n:
+                break
+            events.append((status, p[i+1], p[i+2]))
+            i += 3
+        elif status < 0xE0:   # program change, channel aftertouch
+            if i + 2 > n:
+                break
+            events.append((status, p[i+1], 0))
+            i += 2
+        elif status < 0xF0:   # pitch bend
+            if i + 3 > n:
+                break
+            events.append((status, p[i+1], p[i+2]))
+            i += 3
+        elif status == 0xF0:  # SysEx: memchr the terminator (SIMD in libc)
+            hit = memchr(p + i + 1, 0xF7, n - i - 1)
+            if hit is NULL:
+                break  # no terminator in this datagram; drop the fragment
+            end = (<const unsigned char*>hit) - p
+            events.append((0xF0, bytes(data[i:end+1]), 0))
+            i = end + 1
+        elif status == 0xF8 or status == 0xFA or status == 0xFB \
+                or status == 0xFC or status == 0xFE:
+            events.append((status, 0, 0))
+            i += 1
+        else:
+            i += 1
+    return events
@@ -11,12 +11,17 @@ Usage:
     python3 main.py
 """
 
+import ctypes
+import selectors
 import socket
 import struct
+import sys
 import threading
 import subprocess
 import re
 import time
+from array import array
+
 import mido
 from mido import Message
 
@@ -25,9 +30,71 @@ IPMIDI_MULTICAST_GROUP = "225.0.0.37"
 IPMIDI_PORT_BASE = 21928
 IPMIDI_PORTS = [1, 2, 3]
 
+# Receive sockets (and threads) per ipMIDI port, all bound with SO_REUSEPORT.
+# NOTE: leave this at 1 for multicast ipMIDI. The kernel only load-balances
+# *unicast* datagrams across a SO_REUSEPORT group; multicast is delivered to
+# every member socket, so values > 1 duplicate each incoming message. The
+# fanout only helps if the Nucleus is reconfigured to send unicast.
+RECEIVERS_PER_PORT = 1
+
+# Socket buffer sizes. The OS default receive buffer (~9 KB on macOS) drops
+# datagrams silently under SysEx dumps or dense meter-bridge bursts; ask for
+# enough headroom to absorb them. The kernel may clamp these (macOS:
+# kern.ipc.maxsockbuf) — setup warns with the actually-granted size.
+RECV_BUFFER_SIZE = 4 * 1024 * 1024
+SEND_BUFFER_SIZE = 1024 * 1024
+
+
+class _ifaddrs(ctypes.Structure):
+    pass
+
+
+# Only the leading fields are declared; they are laid out identically on
+# macOS and Linux, and the rest of the struct is never touched.
+_ifaddrs._fields_ = [
+    ("ifa_next", ctypes.POINTER(_ifaddrs)),
+    ("ifa_name", ctypes.c_char_p),
+    ("ifa_flags", ctypes.c_uint),
+    ("ifa_addr", ctypes.c_void_p),
+]
+
+
+def _ipv4_interface_addresses():
+    """List local IPv4 addresses via getifaddrs (no subprocess, no regex)."""
+    libc = ctypes.CDLL(None, use_errno=True)
+    head = ctypes.POINTER(_ifaddrs)()
+    if libc.getifaddrs(ctypes.byref(head)) != 0:
+        raise OSError(ctypes.get_errno(), "getifaddrs failed")
+    addresses = []
+    try:
+        entry = head
+        while entry:
+            ifa = entry.contents
+            if ifa.ifa_addr:
+                raw = ctypes.string_at(ifa.ifa_addr, 8)
+                if sys.platform == 'darwin':
+                    family = raw[1]     # BSD sockaddr: sa_len, then sa_family
+                else:
+                    family = int.from_bytes(raw[0:2], sys.byteorder)
+                if family == socket.AF_INET:
+                    # sockaddr_in: sin_addr lives at offset 4 on both OSes
+                    addresses.append(socket.inet_ntoa(raw[4:8]))
+            entry = ifa.ifa_next
+    finally:
+        libc.freeifaddrs(head)
+    return addresses
+
 
 def find_link_local_ip():
     """Auto-detect the link-local (169.254.x.x) interface for Nucleus connection."""
+    try:
+        for addr in _ipv4_interface_addresses():
+            if addr.startswith("169.254."):
+                return addr
+        return None
+    except Exception:
+        pass
+    # Fallback: scrape ifconfig output (slower; fragile across OS variants)
     try:
         result = subprocess.run(['/sbin/ifconfig'], capture_output=True, text=True)
         # Find all 169.254.x.x addresses
@@ -52,6 +119,12 @@ VERBOSITY = 0
 # Set to False for Mackie Control mode (bidirectional with feedback)
 TRANSLATE_TO_CC = False
 
+# DAW input is callback-driven by default. Set True to fall back to a
+# polling thread on backends where virtual-port callbacks misbehave; the
+# poll drains rtmidi's native queue in one shot per wakeup rather than
+# pulling Messages one at a time through mido.
+DAW_USE_POLLING = False
+
 # CC mapping for faders (pitchwheel channel -> CC number)
 # Nucleus sends pitchwheel on channels 0-7 for faders 1-8, channel 8 for master
 FADER_CC_MAP = {
@@ -66,276 +139,673 @@ FADER_CC_MAP = {
     8: 9,   # Master -> CC 9
 }
 
+# Translation lookup tables, precomputed so the per-event work is a single
+# index instead of float math (pitch->CC) or a linear scan of FADER_CC_MAP
+# (CC->channel). 16 KB for the pitch table is nothing next to the per-event
+# savings at fader-movement rates.
+_PITCH_TO_CC = bytes(max(0, min(127, int(p / 16383 * 127)))
+                     for p in range(16384))
+_CC_TO_PITCH = [int(v / 127 * 16383) - 8192 for v in range(128)]
+_CC_TO_CHANNEL = {cc: ch for ch, cc in FADER_CC_MAP.items()}
+
+# Raw-byte translation templates: a mapped fader event is translated by
+# concatenating a prebuilt header with a looked-up data byte (or pair), so
+# neither direction allocates a Message. Keyed by the full status byte
+# (0xE0..0xE8 for the mapped pitchwheel channels).
+_PW_TO_CC_HEADER = {0xE0 | ch: bytes((0xB0, cc)) for ch, cc in FADER_CC_MAP.items()}
+_CC_VALUE_TO_PW_DATA = [bytes(((p + 8192) & 0x7F, (p + 8192) >> 7))
+                        for p in _CC_TO_PITCH]
+
+
+# QOS_CLASS_USER_INTERACTIVE from <sys/qos.h>
+_QOS_CLASS_USER_INTERACTIVE = 0x21
+
+
+def _set_thread_qos():
+    """Mark the calling thread latency-critical (macOS only).
+
+    On Apple Silicon the scheduler happily migrates a mostly-idle receive
+    thread to an efficiency core, which shows up as jitter in fader
+    response. QOS_CLASS_USER_INTERACTIVE keeps it on performance cores.
+    No-op on other platforms.
+    """
+    if sys.platform != 'darwin':
+        return
+    try:
+        libsystem = ctypes.CDLL(None, use_errno=True)
+        libsystem.pthread_set_qos_class_self_np(_QOS_CLASS_USER_INTERACTIVE, 0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _set_socket_buffer(sock, option, size, label, port_number):
+    """Request a socket buffer size, warning if the kernel clamps it."""
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, option, size)
+    except OSError:
+        pass
+    granted = sock.getsockopt(socket.SOL_SOCKET, option)
+    if granted < size:
+        print(f"  Port {port_number}: {label} clamped to {granted} "
+              f"(wanted {size}; on macOS raise kern.ipc.maxsockbuf)")
+
 
 class ipMIDIReceiver:
-    def __init__(self, port_number):
+    def __init__(self, port_number, worker_index=0):
         self.port_number = port_number
+        self.worker_index = worker_index
         self.udp_port = IPMIDI_PORT_BASE + port_number - 1
         self.socket = None
         self.running = False
+        self._stop_evt = threading.Event()
 
     def setup_socket(self):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        _set_socket_buffer(self.socket, socket.SO_RCVBUF, RECV_BUFFER_SIZE,
+                           "SO_RCVBUF", self.port_number)
         self.socket.bind(('', self.udp_port))
         mreq = struct.pack("4s4s",
                           socket.inet_aton(IPMIDI_MULTICAST_GROUP),
                           socket.inet_aton(LOCAL_IP))
         self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
-        self.socket.settimeout(1.0)
 
     def receive_loop(self, callback):
+        # Park fully in recvfrom: an idle port costs zero wakeups (the old
+        # 1-second timeout woke each thread once a second just to re-check
+        # self.running) and the next datagram wakes the thread immediately.
+        # stop() breaks the block via the stop event + a socket nudge.
+        _set_thread_qos()
         self.running = True
-        while self.running:
+        self.socket.settimeout(None)
+        while not self._stop_evt.is_set():
             try:
                 data, addr = self.socket.recvfrom(1024)
-                if data:
-                    callback(data, self.port_number)
-            except socket.timeout:
+            except OSError as e:
+                if self._stop_evt.is_set():
+                    break
+                print(f"  Receive error port {self.port_number}: {e}")
                 continue
-            except Exception as e:
-                if self.running:
-                    print(f"  Receive error port {self.port_number}: {e}")
+            if data:
+                try:
+                    callback(data, self.port_number)
+                except Exception as e:
+                    print(f"  Error handling data on port {self.port_number}: {e}")
+        self.running = False
 
     def stop(self):
         self.running = False
+        self._stop_evt.set()
         if self.socket:
+            # Wake a blocked recvfrom: shutdown works on some platforms
+            # (raising ENOTCONN for unconnected UDP either way), and a
+            # zero-byte self-datagram is the portable fallback.
+            try:
+                self.socket.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+            try:
+                wake = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                wake.sendto(b'', ('127.0.0.1', self.udp_port))
+                wake.close()
+            except OSError:
+                pass
             self.socket.close()
 
 
 class ipMIDISender:
+    """Per-port sender view over one shared multicast socket.
+
+    A single unconnected UDP socket can sendto() any multicast port, so
+    per-port sockets only multiplied file descriptors and setsockopt
+    state. All instances share one socket (also what lets the sendmmsg
+    batcher aggregate the ports in a single syscall).
+    """
+
+    _shared_socket = None
+
     def __init__(self, port_number):
         self.port_number = port_number
         self.udp_port = IPMIDI_PORT_BASE + port_number - 1
         self.socket = None
 
     def setup_socket(self):
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
-        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
-                              socket.inet_aton(LOCAL_IP))
+        cls = type(self)
+        if cls._shared_socket is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                            socket.inet_aton(LOCAL_IP))
+            _set_socket_buffer(sock, socket.SO_SNDBUF, SEND_BUFFER_SIZE,
+                               "SO_SNDBUF", self.port_number)
+            cls._shared_socket = sock
+        self.socket = cls._shared_socket
 
     def send(self, data):
         if self.socket:
             self.socket.sendto(data, (IPMIDI_MULTICAST_GROUP, self.udp_port))
 
     def stop(self):
-        if self.socket:
-            self.socket.close()
+        cls = type(self)
+        self.socket = None
+        if cls._shared_socket is not None:
+            cls._shared_socket.close()
+            cls._shared_socket = None
+
+
+# --- Batched multicast send (Linux only) ---
+# One DAW message fans out to every ipMIDI port, which normally costs one
+# sendto() syscall per port. Linux's sendmmsg() dispatches all of those
+# datagrams in a single syscall; macOS has no equivalent, so the bridge
+# falls back to the sendto loop there.
+
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _sendmmsg = _libc.sendmmsg
+except (OSError, AttributeError):
+    _sendmmsg = None
+
+
+class _iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p),
+                ("iov_len", ctypes.c_size_t)]
+
+
+class _sockaddr_in(ctypes.Structure):
+    _fields_ = [("sin_family", ctypes.c_uint16),
+                ("sin_port", ctypes.c_uint16),
+                ("sin_addr", ctypes.c_uint32),
+                ("sin_zero", ctypes.c_char * 8)]
+
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_iovec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _msghdr),
+                ("msg_len", ctypes.c_uint)]
+
+
+class MulticastBatcher:
+    """Send one payload to several multicast ports in a single sendmmsg().
+
+    The mmsghdr/iovec/sockaddr arrays are allocated once; each send only
+    repoints the iovec bases at the payload buffer.
+    """
+
+    def __init__(self, sock, udp_ports):
+        self.sock = sock
+        # send() repoints the shared iovecs, and it is reached from both
+        # the main thread (MCU init) and rtmidi's callback thread; ctypes
+        # releases the GIL during the syscall, so serialize sends.
+        self._lock = threading.Lock()
+        n = len(udp_ports)
+        self._count = n
+        self._addrs = (_sockaddr_in * n)()
+        self._iovecs = (_iovec * n)()
+        self._hdrs = (_mmsghdr * n)()
+        group = struct.unpack("=I", socket.inet_aton(IPMIDI_MULTICAST_GROUP))[0]
+        for i, udp_port in enumerate(udp_ports):
+            self._addrs[i].sin_family = socket.AF_INET
+            self._addrs[i].sin_port = socket.htons(udp_port)
+            self._addrs[i].sin_addr = group
+            hdr = self._hdrs[i].msg_hdr
+            hdr.msg_name = ctypes.cast(ctypes.pointer(self._addrs[i]),
+                                       ctypes.c_void_p)
+            hdr.msg_namelen = ctypes.sizeof(_sockaddr_in)
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+
+    def send(self, data):
+        """Send `data` to every port; return number of datagrams sent."""
+        # bytes objects are immutable, so pointing the iovec at the buffer
+        # is safe for the duration of the syscall.
+        base = ctypes.cast(ctypes.c_char_p(data), ctypes.c_void_p)
+        with self._lock:
+            for i in range(self._count):
+                self._iovecs[i].iov_base = base
+                self._iovecs[i].iov_len = len(data)
+            sent = _sendmmsg(self.sock.fileno(), self._hdrs, self._count, 0)
+        return sent
+
+
+# --- MIDI byte parsing ---
+# The byte-level scan is split from mido Message construction so the scan can
+# run in the optional compiled extension (_midiparser.pyx, built via
+# setup.py). Both implementations emit the same low-level events:
+# (status, data1, data2) tuples, with missing data bytes as 0, and
+# (0xF0, frame, 0) for SysEx, where frame is the complete F0..F7 wire
+# slice (a zero-copy memoryview on the Python path) — a firmware dump is
+# forwarded without ever exploding into per-byte Python ints. Messages are
+# only built from events that the bridge actually forwards.
+
+def _ev_3byte(data, i):
+    return (data[i], data[i+1], data[i+2]), i + 3
+
+
+def _ev_2byte(data, i):
+    return (data[i], data[i+1], 0), i + 2
+
+
+def _ev_realtime(data, i):
+    return (data[i], 0, 0), i + 1
+
+
+def _ev_sysex(data, i):
+    end = data.find(0xF7, i)
+    if end == -1:
+        # No terminator in this datagram; drop the fragment.
+        return None, len(data)
+    return (0xF0, memoryview(data)[i:end+1], 0), end + 1
+
+
+# Status byte -> (handler, minimum length); handlers return (event, next_i).
+_STATUS_TABLE = [None] * 256
+for _status in range(0x80, 0xC0):   # note off/on, polytouch, control change
+    _STATUS_TABLE[_status] = (_ev_3byte, 3)
+for _status in range(0xC0, 0xE0):   # program change, channel aftertouch
+    _STATUS_TABLE[_status] = (_ev_2byte, 2)
+for _status in range(0xE0, 0xF0):   # pitch bend
+    _STATUS_TABLE[_status] = (_ev_3byte, 3)
+_STATUS_TABLE[0xF0] = (_ev_sysex, 1)
+for _status in (0xF8, 0xFA, 0xFB, 0xFC, 0xFE):
+    _STATUS_TABLE[_status] = (_ev_realtime, 1)
+del _status
+
+
+def _parse_events_py(data):
+    """Scan raw MIDI bytes, yielding low-level event tuples (pure Python).
+
+    A generator, so consumers that drop events (echo filtering) never pay
+    for a materialized list. The compiled scanner returns a list instead;
+    both are simply iterated.
+    """
+    i = 0
+    n = len(data)
+    table = _STATUS_TABLE
+    while i < n:
+        entry = table[data[i]]
+        if entry is None:
+            i += 1
+            continue
+        if i + entry[1] > n:
+            break  # truncated message at end of datagram
+        ev, i = entry[0](data, i)
+        if ev is not None:
+            yield ev
+
+
+try:
+    # Compiled scanner; build with: python3 setup.py build_ext --inplace
+    from _midiparser import parse_events
+except ImportError:
+    parse_events = _parse_events_py
+
+
+# System realtime messages carry no data, so constructing one per event is
+# wasted validation work — keep prototypes and hand out copies.
+_REALTIME_PROTOTYPES = {
+    0xF8: Message('clock'),
+    0xFA: Message('start'),
+    0xFB: Message('continue'),
+    0xFC: Message('stop'),
+    0xFE: Message('active_sensing'),
+}
+
+
+def _message_from_event(ev):
+    """Build a mido Message from a low-level (status, d1, d2) event."""
+    status = ev[0]
+    if status < 0xF0:
+        channel = status & 0x0F
+        kind = status & 0xF0
+        if kind == 0x80:
+            return Message('note_off', channel=channel, note=ev[1], velocity=ev[2])
+        if kind == 0x90:
+            if ev[2] == 0:
+                return Message('note_off', channel=channel, note=ev[1], velocity=0)
+            return Message('note_on', channel=channel, note=ev[1], velocity=ev[2])
+        if kind == 0xA0:
+            return Message('polytouch', channel=channel, note=ev[1], value=ev[2])
+        if kind == 0xB0:
+            return Message('control_change', channel=channel, control=ev[1], value=ev[2])
+        if kind == 0xC0:
+            return Message('program_change', channel=channel, program=ev[1])
+        if kind == 0xD0:
+            return Message('aftertouch', channel=channel, value=ev[1])
+        return Message('pitchwheel', channel=channel,
+                       pitch=(ev[1] | (ev[2] << 7)) - 8192)
+    if status == 0xF0:
+        return Message('sysex', data=tuple(ev[1][1:-1]))  # strip F0/F7 framing
+    return _REALTIME_PROTOTYPES[status].copy()
+
+
+def _event_key(status, d1, d2):
+    """Pack an echo-filter key straight from raw MIDI bytes.
+
+    Key layout: type nibble, channel, then the two data bytes. Returns
+    None for types that are not echo-filtered. Note-on velocity, note-off
+    and CC values are included so different states never block each other;
+    pitchwheel excludes the value because faders stream continuous values.
+    """
+    kind = status & 0xF0
+    channel = status & 0x0F
+    if kind == 0x90 and d2 != 0:
+        return (0x9 << 24) | (channel << 16) | (d1 << 8) | d2
+    if kind == 0x80 or kind == 0x90:   # note off (incl. note on, velocity 0)
+        return (0x8 << 24) | (channel << 16) | (d1 << 8)
+    if kind == 0xB0:
+        return (0xB << 24) | (channel << 16) | (d1 << 8) | d2
+    if kind == 0xE0:
+        # Don't include pitch value - faders send continuous values
+        return (0xE << 24) | (channel << 16)
+    return None
+
+
+def _event_bytes(ev):
+    """Reassemble the wire bytes (or buffer) for a low-level event."""
+    status = ev[0]
+    if status < 0xF0:
+        kind = status & 0xF0
+        if kind == 0xC0 or kind == 0xD0:
+            return bytes((status, ev[1]))
+        return bytes((status, ev[1], ev[2]))
+    if status == 0xF0:
+        return ev[1]  # already the complete F0..F7 frame, no copy
+    return bytes((status,))
+
+
+class EchoFilter:
+    """Fixed-size debounce table for feedback-loop suppression.
+
+    Keys are packed uint32s (type nibble, channel, two data bytes) hashed
+    into a fixed number of slots, each holding the key and its last-sent
+    timestamp. Memory stays bounded no matter how many distinct messages
+    pass through — the old dict-based tracking kept every distinct
+    (type, channel, data, value) combination forever, so it grew on every
+    fader tick. A colliding key simply overwrites its slot; worst case an
+    echo slips through once, the same as missing the debounce window.
+
+    Timestamps are time.monotonic_ns() values: integer compares, immune
+    to wall-clock steps, and cheaper than float time.time() per message.
+    """
+
+    SLOTS = 65536  # power of two so the index is a mask
+
+    def __init__(self, debounce_ns):
+        self.debounce_ns = debounce_ns
+        self._times = array('q', [0]) * self.SLOTS
+        self._keys = array('I', [0]) * self.SLOTS
+
+    def check(self, key, now_ns):
+        """Return True if `key` was marked within the debounce window."""
+        idx = (key ^ (key >> 16)) & 0xFFFF
+        return self._keys[idx] == key and now_ns - self._times[idx] < self.debounce_ns
+
+    def mark(self, key, now_ns):
+        """Record `key` as sent at monotonic time `now_ns`."""
+        idx = (key ^ (key >> 16)) & 0xFFFF
+        self._keys[idx] = key
+        self._times[idx] = now_ns
 
 
 class NucleusBridge:
     def __init__(self):
         self.receivers = []
         self.senders = []
+        self.batcher = None  # MulticastBatcher when sendmmsg is available
+        self._selector = None  # set when one thread services all receivers
+        self._receive_thread = None
+        self._wake_sock = None  # wakes the selector thread for shutdown
         self.midi_out = None
         self.midi_in = None
+        self._daw_handler = None  # bound by setup_daw_input
         self.running = False
         self.rx_count = 0
         self.tx_count = 0
+        # Serializes forwarding to the DAW when multiple receive threads run
+        # (RECEIVERS_PER_PORT > 1): rtmidi output ports are not thread-safe.
+        self.midi_out_lock = threading.Lock()
         # Feedback loop prevention: track recent messages
-        self.recent_to_daw = {}      # msg_key -> timestamp
-        self.recent_to_nucleus = {}  # msg_key -> timestamp
-        self.debounce_time = 0.010   # 10ms debounce window (allows LED feedback through)
-
-    def msg_key(self, msg):
-        """Create a hashable key for a message (includes value to avoid blocking different states)."""
-        if msg.type == 'note_on':
-            return ('note_on', msg.channel, msg.note, msg.velocity)
-        elif msg.type == 'note_off':
-            return ('note_off', msg.channel, msg.note)
-        elif msg.type == 'control_change':
-            return ('cc', msg.channel, msg.control, msg.value)
-        elif msg.type == 'pitchwheel':
-            # Don't include pitch value - faders send continuous values
-            return ('pitch', msg.channel)
-        return None
-
-    def is_echo(self, msg, recent_dict):
-        """Check if this message is an echo of a recent message."""
-        key = self.msg_key(msg)
-        if key is None:
-            return False
-        now = time.time()
-        if key in recent_dict:
-            if now - recent_dict[key] < self.debounce_time:
-                return True
-        return False
-
-    def mark_sent(self, msg, recent_dict):
-        """Mark a message as recently sent."""
-        key = self.msg_key(msg)
-        if key:
-            recent_dict[key] = time.time()
+        self.debounce_ns = 10_000_000  # 10ms debounce window (allows LED feedback through)
+        self.recent_to_daw = EchoFilter(self.debounce_ns)
+        self.recent_to_nucleus = EchoFilter(self.debounce_ns)
+        # Specialize for the configured mode once, rather than re-checking
+        # TRANSLATE_TO_CC on every message: the bound handler has no mode
+        # branches on its hot path.
+        if TRANSLATE_TO_CC:
+            self.handle_from_nucleus = self._handle_from_nucleus_cc
+        else:
+            self.handle_from_nucleus = self._handle_from_nucleus_raw
 
     def parse_midi_bytes(self, data):
         """Parse raw MIDI bytes into mido Messages."""
-        messages = []
-        i = 0
-        while i < len(data):
-            status = data[i]
-
-            if 0x80 <= status <= 0x8F:  # Note Off
-                if i + 2 < len(data):
-                    messages.append(Message('note_off', channel=status & 0x0F,
-                                           note=data[i+1], velocity=data[i+2]))
-                    i += 3
+        return [_message_from_event(ev) for ev in parse_events(data)]
+
+    def _handle_from_nucleus_cc(self, data, port_number):
+        """Forward Nucleus data to DAW, translating faders to CC.
+
+        Raw bytes end to end, like the transparent path: a mapped
+        pitchwheel becomes a CC message by concatenating the prebuilt
+        header with the LUT value byte; everything else (which the old
+        translate_to_cc passed through unchanged) forwards as-is.
+        """
+        to_nucleus = self.recent_to_nucleus
+        to_daw = self.recent_to_daw
+        for ev in parse_events(data):
+            with self.midi_out_lock:
+                self.rx_count += 1
+                now = time.monotonic_ns()
+                status = ev[0]
+                key = _event_key(status, ev[1], ev[2]) if status < 0xF0 else None
+
+                # Check if this is an echo of something we sent to Nucleus
+                if key is not None and to_nucleus.check(key, now):
+                    if VERBOSITY >= 2:
+                        print(f"  [BLOCKED ECHO] Nucleus -> DAW: {_message_from_event(ev)}")
+                    continue
+
+                header = _PW_TO_CC_HEADER.get(status)
+                if header is not None:
+                    # Mask to 14 bits: a corrupt datagram can carry data
+                    # bytes with the high bit set, which would index past
+                    # the table.
+                    value = _PITCH_TO_CC[(ev[1] | (ev[2] << 7)) & 0x3FFF]
+                    out = header + bytes((value,))
+                    out_key = _event_key(0xB0, header[1], value)
                 else:
-                    break
-            elif 0x90 <= status <= 0x9F:  # Note On
-                if i + 2 < len(data):
-                    vel = data[i+2]
-                    if vel == 0:
-                        messages.append(Message('note_off', channel=status & 0x0F,
-                                               note=data[i+1], velocity=0))
-                    else:
-                        messages.append(Message('note_on', channel=status & 0x0F,
-                                               note=data[i+1], velocity=vel))
-                    i += 3
-                else:
-                    break
-            elif 0xA0 <= status <= 0xAF:  # Poly Aftertouch
-                if i + 2 < len(data):
-                    messages.append(Message('polytouch', channel=status & 0x0F,
-                                           note=data[i+1], value=data[i+2]))
-                    i += 3
-                else:
-                    break
-            elif 0xB0 <= status <= 0xBF:  # Control Change
-                if i + 2 < len(data):
-                    messages.append(Message('control_change', channel=status & 0x0F,
-                                           control=data[i+1], value=data[i+2]))
-                    i += 3
-                else:
-                    break
-            elif 0xC0 <= status <= 0xCF:  # Program Change
-                if i + 1 < len(data):
-                    messages.append(Message('program_change', channel=status & 0x0F,
-                                           program=data[i+1]))
-                    i += 2
-                else:
-                    break
-            elif 0xD0 <= status <= 0xDF:  # Channel Aftertouch
-                if i + 1 < len(data):
-                    messages.append(Message('aftertouch', channel=status & 0x0F,
-                                           value=data[i+1]))
-                    i += 2
-                else:
-                    break
-            elif 0xE0 <= status <= 0xEF:  # Pitch Bend
-                if i + 2 < len(data):
-                    value = data[i+1] | (data[i+2] << 7)
-                    messages.append(Message('pitchwheel', channel=status & 0x0F,
-                                           pitch=value - 8192))
-                    i += 3
+                    out = _event_bytes(ev)
+                    out_key = key
+
+                if self.midi_out:
+                    self.midi_out._rt.send_message(out)
+                    if out_key is not None:
+                        to_daw.mark(out_key, now)
+
+            if VERBOSITY >= 2 or (VERBOSITY >= 1 and status not in (0xF8, 0xFE)):
+                if header is not None:
+                    print(f"  Nucleus -> DAW: {_message_from_event(ev)} -> "
+                          f"{Message.from_bytes(out)}")
                 else:
-                    break
-            elif status == 0xF0:  # SysEx
-                end = data.find(0xF7, i)
-                if end != -1:
-                    messages.append(Message('sysex', data=tuple(data[i+1:end])))
-                    i = end + 1
-                else:
-                    break
-            elif status == 0xF8:  # Clock
-                messages.append(Message('clock'))
-                i += 1
-            elif status == 0xFA:  # Start
-                messages.append(Message('start'))
-                i += 1
-            elif status == 0xFB:  # Continue
-                messages.append(Message('continue'))
-                i += 1
-            elif status == 0xFC:  # Stop
-                messages.append(Message('stop'))
-                i += 1
-            elif status == 0xFE:  # Active Sensing
-                messages.append(Message('active_sensing'))
-                i += 1
-            else:
-                i += 1
-        return messages
-
-    def translate_to_cc(self, msg):
-        """Convert MCU pitchwheel to CC for Ableton InstantMapping."""
-        if msg.type == 'pitchwheel' and msg.channel in FADER_CC_MAP:
-            # Convert 14-bit pitch (-8192 to 8191) to 7-bit CC (0-127)
-            cc_value = int((msg.pitch + 8192) / 16383 * 127)
-            cc_value = max(0, min(127, cc_value))
-            cc_num = FADER_CC_MAP[msg.channel]
-            return Message('control_change', channel=0, control=cc_num, value=cc_value)
-        return msg
-
-    def translate_from_cc(self, msg):
-        """Convert CC back to MCU pitchwheel for Nucleus feedback."""
-        if msg.type == 'control_change' and msg.control in FADER_CC_MAP.values():
-            # Find which channel this CC maps to
-            for channel, cc in FADER_CC_MAP.items():
-                if cc == msg.control:
-                    # Convert 7-bit CC (0-127) to 14-bit pitch (-8192 to 8191)
-                    pitch = int(msg.value / 127 * 16383) - 8192
-                    return Message('pitchwheel', channel=channel, pitch=pitch)
-        return msg
-
-    def handle_from_nucleus(self, data, port_number):
-        """Forward Nucleus data to DAW."""
-        messages = self.parse_midi_bytes(data)
-        for msg in messages:
-            self.rx_count += 1
-
-            # Check if this is an echo of something we sent to Nucleus
-            if self.is_echo(msg, self.recent_to_nucleus):
-                if VERBOSITY >= 2:
-                    print(f"  [BLOCKED ECHO] Nucleus -> DAW: {msg}")
-                continue
-
-            # Translate if enabled
-            out_msg = self.translate_to_cc(msg) if TRANSLATE_TO_CC else msg
-
-            if self.midi_out:
-                self.midi_out.send(out_msg)
-                self.mark_sent(out_msg, self.recent_to_daw)
-
-            if VERBOSITY >= 2 or (VERBOSITY >= 1 and msg.type not in ('clock', 'active_sensing')):
-                if TRANSLATE_TO_CC and msg != out_msg:
-                    print(f"  Nucleus -> DAW: {msg} -> {out_msg}")
-                else:
-                    print(f"  Nucleus -> DAW: {msg}")
-
-    def handle_from_daw(self, msg):
-        """Forward DAW data to Nucleus."""
+                    print(f"  Nucleus -> DAW: {_message_from_event(ev)}")
+
+    def _handle_from_nucleus_raw(self, data, port_number=0):
+        """Raw-bytes fast path: echo-filter and forward without Messages."""
+        to_nucleus = self.recent_to_nucleus
+        to_daw = self.recent_to_daw
+        for ev in parse_events(data):
+            with self.midi_out_lock:
+                self.rx_count += 1
+                now = time.monotonic_ns()
+                key = _event_key(ev[0], ev[1], ev[2]) if ev[0] < 0xF0 else None
+                if key is not None and to_nucleus.check(key, now):
+                    if VERBOSITY >= 2:
+                        print(f"  [BLOCKED ECHO] Nucleus -> DAW: {_message_from_event(ev)}")
+                    continue
+                if self.midi_out:
+                    self.midi_out._rt.send_message(_event_bytes(ev))
+                    if key is not None:
+                        to_daw.mark(key, now)
+            if VERBOSITY >= 2 or (VERBOSITY >= 1 and ev[0] not in (0xF8, 0xFE)):
+                print(f"  Nucleus -> DAW: {_message_from_event(ev)}")
+
+    def handle_raw_from_daw(self, data):
+        """Raw-bytes fast path for DAW -> Nucleus (no translation)."""
         self.tx_count += 1
-
-        # Check if this is an echo of something we sent to DAW
-        if self.is_echo(msg, self.recent_to_daw):
+        now = time.monotonic_ns()
+        key = _event_key(data[0], data[1] if len(data) > 1 else 0,
+                         data[2] if len(data) > 2 else 0)
+        if key is not None and self.recent_to_daw.check(key, now):
+            if VERBOSITY >= 2:
+                print(f"  [BLOCKED ECHO] DAW -> Nucleus: {data.hex()}")
+            return
+        self.send_to_nucleus(data)
+        if key is not None:
+            self.recent_to_nucleus.mark(key, now)
+        if VERBOSITY >= 2 or (VERBOSITY >= 1 and data[0] not in (0xF8, 0xFE)):
+            print(f"  DAW -> Nucleus: {data.hex()}")
+
+    def handle_raw_from_daw_cc(self, data):
+        """DAW -> Nucleus with CC->pitchwheel translation, on raw bytes.
+
+        A mapped CC becomes a pitchwheel message from the prebuilt status
+        byte plus LUT data-byte pair (what translate_from_cc used to do
+        via two Message objects); everything else forwards as-is.
+        """
+        self.tx_count += 1
+        status = data[0]
+        d1 = data[1] if len(data) > 1 else 0
+        d2 = data[2] if len(data) > 2 else 0
+        now = time.monotonic_ns()
+        key = _event_key(status, d1, d2)
+        if key is not None and self.recent_to_daw.check(key, now):
             if VERBOSITY >= 2:
-                print(f"  [BLOCKED ECHO] DAW -> Nucleus: {msg}")
+                print(f"  [BLOCKED ECHO] DAW -> Nucleus: {data.hex()}")
             return
+        channel = _CC_TO_CHANNEL.get(d1) if (status & 0xF0) == 0xB0 else None
+        if channel is not None:
+            # Mask to 7 bits for the same reason as the pitch table above.
+            out = bytes((0xE0 | channel,)) + _CC_VALUE_TO_PW_DATA[d2 & 0x7F]
+            out_key = _event_key(0xE0 | channel, 0, 0)
+        else:
+            out = data
+            out_key = key
+        self.send_to_nucleus(out)
+        if out_key is not None:
+            self.recent_to_nucleus.mark(out_key, now)
+        if VERBOSITY >= 2 or (VERBOSITY >= 1 and status not in (0xF8, 0xFE)):
+            if channel is not None:
+                print(f"  DAW -> Nucleus: {data.hex()} -> {out.hex()}")
+            else:
+                print(f"  DAW -> Nucleus: {data.hex()}")
 
-        # Translate CC back to pitchwheel for Nucleus
-        out_msg = self.translate_from_cc(msg) if TRANSLATE_TO_CC else msg
+    def receive_all_loop(self):
+        """Service every receive socket from one kqueue/epoll thread.
 
-        data = bytes(out_msg.bytes())
-        for sender in self.senders:
+        Blocks in select() until any port is readable; stop() wakes it
+        for shutdown via the dedicated wake socket.
+        """
+        _set_thread_qos()
+        sel = self._selector
+        while self.running:
+            try:
+                ready = sel.select(timeout=None)
+            except OSError as e:
+                if not self.running:
+                    break
+                print(f"  Receive error: {e}")
+                continue
+            for key, _events in ready:
+                if key.data is None:
+                    # stop() wake datagram; the while condition exits.
+                    key.fileobj.recvfrom(16)
+                    continue
+                # One thread services every port, so a handler exception
+                # must never escape: it would stop all receiving at once.
+                try:
+                    data, addr = key.fileobj.recvfrom(1024)
+                    if data:
+                        self.handle_from_nucleus(data, key.data.port_number)
+                except Exception as e:
+                    if not self.running:
+                        return
+                    print(f"  Error handling data on port "
+                          f"{key.data.port_number}: {e}")
+
+    def send_to_nucleus(self, data):
+        """Send raw MIDI bytes to every ipMIDI port, batched when possible."""
+        if self.batcher is not None:
+            sent = self.batcher.send(data)
+            if sent == len(self.senders):
+                return
+            # Partial send or error: fall through and resend the remainder
+            # (or everything) via plain sendto.
+            remaining = self.senders[max(sent, 0):]
+        else:
+            remaining = self.senders
+        for sender in remaining:
             sender.send(data)
-        self.mark_sent(out_msg, self.recent_to_nucleus)
 
-        if VERBOSITY >= 2 or (VERBOSITY >= 1 and msg.type not in ('clock', 'active_sensing')):
-            if TRANSLATE_TO_CC and msg != out_msg:
-                print(f"  DAW -> Nucleus: {msg} -> {out_msg}")
-            else:
-                print(f"  DAW -> Nucleus: {msg}")
-
-    def daw_receive_loop(self):
+    def setup_daw_input(self):
+        """Wire DAW input to rtmidi's callback thread (no polling loop).
+
+        rtmidi invokes the handler as messages arrive, so idle costs
+        nothing and delivery latency is the callback dispatch, not a poll
+        interval. Handlers run on rtmidi's worker thread; that is the only
+        writer of tx_count, and EchoFilter slot updates are single array
+        stores, safe to share with the receive threads under the GIL.
+        """
+        if TRANSLATE_TO_CC:
+            self._daw_handler = self.handle_raw_from_daw_cc
+        else:
+            self._daw_handler = self.handle_raw_from_daw
+        # Both modes work on wire bytes now, so mido's Message-building
+        # callback is always replaced with the raw rtmidi one.
+        rt = self.midi_in._rt
+        rt.cancel_callback()
+        if DAW_USE_POLLING:
+            threading.Thread(target=self.daw_poll_loop, daemon=True).start()
+        else:
+            rt.set_callback(self._raw_daw_callback)
+
+    def daw_poll_loop(self):
+        """Polling fallback: drain rtmidi's native queue in one shot.
+
+        get_message() hands back raw (bytes, delta) pairs straight off the
+        C queue, so a burst is drained in one tight loop per wakeup instead
+        of one mido Message per poll call.
+        """
+        _set_thread_qos()
+        rt = self.midi_in._rt
+        idle = threading.Event()
+        deliver = self._daw_handler
         while self.running:
-            try:
-                for msg in self.midi_in.iter_pending():
-                    self.handle_from_daw(msg)
-                threading.Event().wait(0.001)
-            except Exception as e:
-                if self.running:
-                    print(f"  Error from DAW: {e}")
+            polled = rt.get_message()
+            if polled is None:
+                idle.wait(0.001)
+                continue
+            while polled is not None:
+                try:
+                    deliver(bytes(polled[0]))
+                except Exception as e:
+                    if self.running:
+                        print(f"  Error from DAW: {e}")
+                polled = rt.get_message()
+
+    def _raw_daw_callback(self, msg_data, _user_data=None):
+        try:
+            self._daw_handler(bytes(msg_data[0]))
+        except Exception as e:
+            if self.running:
+                print(f"  Error from DAW: {e}")
 
     def start(self):
         print("\n" + "=" * 60)
@@ -358,17 +828,40 @@ class NucleusBridge:
             print("Make sure the Nucleus is connected via Ethernet.")
             return
         print(f"\nipMIDI on {LOCAL_IP} -> {IPMIDI_MULTICAST_GROUP}")
+        # Default: one kqueue/epoll thread services every port — for a
+        # handful of sockets this beats a thread per port, which just adds
+        # GIL ping-pong between parsers. Per-socket threads remain for the
+        # SO_REUSEPORT fanout case (unicast setups with a compiled parser).
+        use_selector = RECEIVERS_PER_PORT == 1
+        if use_selector:
+            self._selector = selectors.DefaultSelector()
+            # Dedicated shutdown wake. A nudge datagram to a receiver port
+            # is not enough here: stop() closes the receiver sockets, and a
+            # closed fd drops out of the kqueue/epoll interest set, so a
+            # wake that raced the close would be lost and the thread would
+            # block in select() forever. This socket stays open until the
+            # thread has been joined.
+            self._wake_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._wake_sock.bind(('127.0.0.1', 0))
+            self._selector.register(self._wake_sock, selectors.EVENT_READ,
+                                    None)
         for port_num in IPMIDI_PORTS:
-            receiver = ipMIDIReceiver(port_num)
-            try:
-                receiver.setup_socket()
-                self.receivers.append(receiver)
-                t = threading.Thread(target=receiver.receive_loop,
-                                    args=(self.handle_from_nucleus,), daemon=True)
-                t.start()
-                print(f"  Port {port_num} (UDP {receiver.udp_port}): listening ✓")
-            except Exception as e:
-                print(f"  Port {port_num}: {e}")
+            for worker in range(RECEIVERS_PER_PORT):
+                receiver = ipMIDIReceiver(port_num, worker)
+                try:
+                    receiver.setup_socket()
+                    self.receivers.append(receiver)
+                    if use_selector:
+                        self._selector.register(receiver.socket,
+                                                selectors.EVENT_READ, receiver)
+                    else:
+                        t = threading.Thread(target=receiver.receive_loop,
+                                            args=(self.handle_from_nucleus,), daemon=True)
+                        t.start()
+                    if worker == 0:
+                        print(f"  Port {port_num} (UDP {receiver.udp_port}): listening ✓")
+                except Exception as e:
+                    print(f"  Port {port_num} worker {worker}: {e}")
 
             sender = ipMIDISender(port_num)
             try:
@@ -381,8 +874,22 @@ class NucleusBridge:
             print("\nNo ports opened!")
             return
 
+        # Linux: batch the per-port fanout into one sendmmsg syscall.
+        # Any sender socket can reach all ports, so batch on the first.
+        if _sendmmsg is not None and len(self.senders) >= 2:
+            try:
+                self.batcher = MulticastBatcher(
+                    self.senders[0].socket,
+                    [s.udp_port for s in self.senders])
+            except Exception as e:
+                print(f"  sendmmsg batching unavailable: {e}")
+
         self.running = True
-        threading.Thread(target=self.daw_receive_loop, daemon=True).start()
+        if use_selector:
+            self._receive_thread = threading.Thread(
+                target=self.receive_all_loop, daemon=True)
+            self._receive_thread.start()
+        self.setup_daw_input()
 
         # Send MCU initialization to wake up the connection
         self.send_mcu_init()
@@ -400,22 +907,27 @@ class NucleusBridge:
         # MCU Device Query (SysEx) - triggers Ableton to respond
         # F0 00 00 66 14 00 F7 = Mackie Control device query
         device_query = bytes([0xF0, 0x00, 0x00, 0x66, 0x14, 0x00, 0xF7])
-        for sender in self.senders:
-            sender.send(device_query)
+        self.send_to_nucleus(device_query)
 
         # Send fader touch messages for channels 0-7 (touch then release)
         # This simulates touching faders to trigger Ableton's initial sync
+        # Send through the raw path under midi_out_lock: the receive
+        # thread may already be forwarding the Nucleus's query responses
+        # to the same rtmidi port, and mido's send() serializes only on
+        # its own internal lock.
         time.sleep(0.1)
         for ch in range(8):
             # Note 104-111 = fader touch for channels 1-8 in MCU
             touch_on = Message('note_on', channel=0, note=104 + ch, velocity=127)
             if self.midi_out:
-                self.midi_out.send(touch_on)
+                with self.midi_out_lock:
+                    self.midi_out._rt.send_message(touch_on.bytes())
         time.sleep(0.05)
         for ch in range(8):
             touch_off = Message('note_off', channel=0, note=104 + ch, velocity=0)
             if self.midi_out:
-                self.midi_out.send(touch_off)
+                with self.midi_out_lock:
+                    self.midi_out._rt.send_message(touch_off.bytes())
 
         print("  MCU init sent ✓")
 
@@ -428,8 +940,24 @@ class NucleusBridge:
 
     def stop(self):
         self.running = False
+        # Wake and join the selector thread before touching the receiver
+        # sockets: closing an fd removes it from the interest set, so any
+        # nudge sent through it could be lost.
+        if self._receive_thread is not None:
+            try:
+                self._wake_sock.sendto(b'', self._wake_sock.getsockname())
+            except OSError:
+                pass
+            self._receive_thread.join(timeout=2)
+            self._receive_thread = None
         for r in self.receivers:
             r.stop()
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+        if self._wake_sock is not None:
+            self._wake_sock.close()
+            self._wake_sock = None
         for s in self.senders:
             s.stop()
         if self.midi_out:
@@ -440,7 +968,6 @@ class NucleusBridge:
 
 
 if __name__ == "__main__":
-    import sys
     if len(sys.argv) > 1 and sys.argv[1] == "--list":
         print("\nOutputs:", mido.get_output_names())
         print("Inputs:", mido.get_input_names())
@@ -0,0 +1,18 @@
+"""Build the optional compiled MIDI scanner:
+
+    pip install cython
+    python3 setup.py build_ext --inplace
+
+The bridge runs fine without it, using the pure-Python scanner instead.
+"""
+
+from setuptools import Extension, setup
+from Cython.Build import cythonize
+
+setup(
+    name="nucleusbridge-midiparser",
+    ext_modules=cythonize(
+        [Extension("_midiparser", ["_midiparser.pyx"],
+                   extra_compile_args=["-O3"])],
+    ),
+)